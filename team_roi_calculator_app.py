@@ -1,5 +1,10 @@
+from types import MappingProxyType
+from typing import NamedTuple
+
+import numpy as np
 import streamlit as st
-import pandas as pd
+
+from roi_kernel import compute_roi
 
 # ---------- fixed assumptions ----------
 CMS_DISCOUNT_PCT = 3.0
@@ -9,18 +14,109 @@ HHA_EXTRA_COST   = 200
 SNF_DAILY_COST   = 305
 SNF_LOS_DAYS     = (22.1 + 30.8) / 2  # 26.5 days
 
-PROCEDURE_META = {
-    "Lower extremity joint replacement": {"baseline": 26_500, "snf_util": 0.45},
-    "Hip/femur fracture":                {"baseline": 29_500, "snf_util": 0.70},
-    "Spinal fusion":                     {"baseline": 42_000, "snf_util": 0.30},
-    "Major bowel procedure":             {"baseline": 35_000, "snf_util": 0.25},
+_DISCOUNT_FACTOR = 1 - CMS_DISCOUNT_PCT/100   # target price / baseline
+_QUALITY_FACTOR  = 1 + CH_QUALITY_PPT/100     # quality-adjusted / annual recon
+
+# static page text
+_ASSUMPTIONS_MD = (
+    f"**Assumptions**  \n"
+    f"• SNF ${SNF_DAILY_COST:,}/day × {SNF_LOS_DAYS:.1f} days  \n"
+    f"• Home-health increment +${HHA_EXTRA_COST}  \n"
+    f"• Current Health cost ${CH_COST_EPISODE:,}/episode  \n"
+    f"• Quality boost +{CH_QUALITY_PPT:.1f} pp"
+)
+
+# whole-dollar currency formatter shared by metrics, captions and table
+_usd = "${:,.0f}".format
+
+# calculation table display formatters
+_TABLE_FORMATS = {
+    "Baseline cost":          _usd,
+    "Target price":           _usd,
+    "Expected cost":          _usd,
+    "Recon per episode":      _usd,
+    "Annual reconciliation":  _usd,
+    "Quality-adjusted recon": _usd,
+    "Cost-reduction %":       "{:,.1f}%".format,
 }
 
-# pre-compute savings %
-for m in PROCEDURE_META.values():
-    snf_saved = m["snf_util"] * SNF_LOS_DAYS * SNF_DAILY_COST
-    net_saved = snf_saved - HHA_EXTRA_COST - CH_COST_EPISODE
-    m["savings_pct"] = round(net_saved / m["baseline"] * 100, 1)
+
+class ProcMeta(NamedTuple):
+    baseline: float
+    snf_util: float
+
+
+PROCEDURE_META = MappingProxyType({
+    "Lower extremity joint replacement": ProcMeta(baseline=26_500, snf_util=0.45),
+    "Hip/femur fracture":                ProcMeta(baseline=29_500, snf_util=0.70),
+    "Spinal fusion":                     ProcMeta(baseline=42_000, snf_util=0.30),
+    "Major bowel procedure":             ProcMeta(baseline=35_000, snf_util=0.25),
+})
+
+
+# structure-of-arrays view of PROCEDURE_META; savings % in one vector op.
+# Not cached: it reads the constants above, and a cache keyed only on the
+# function would keep serving stale arrays after they are edited.
+def _build_procedure_arrays():
+    names     = tuple(PROCEDURE_META)
+    baselines = np.array([m.baseline for m in PROCEDURE_META.values()],
+                         dtype=np.float64)
+    snf_util  = np.array([m.snf_util for m in PROCEDURE_META.values()],
+                         dtype=np.float64)
+    net_saved = (snf_util * SNF_LOS_DAYS * SNF_DAILY_COST
+                 - HHA_EXTRA_COST - CH_COST_EPISODE)
+    savings_pct = np.round(net_saved / baselines * 100, 1)
+    savings_factors = 1 - savings_pct/100
+
+    # shared by the widgets and the model; freeze against accidental edits
+    arrays = (baselines, snf_util, savings_pct, savings_factors)
+    for arr in arrays:
+        arr.setflags(write=False)
+    return (names, *arrays)
+
+
+(PROC_NAMES, BASELINES, SNF_UTIL,
+ SAVINGS_PCT, SAVINGS_FACTORS) = _build_procedure_arrays()
+
+# widget keys, heading and caption text per procedure
+_VOL_KEYS = tuple(f"vol_{i}" for i in range(len(PROC_NAMES)))
+_HEADERS = tuple(f"**{proc}**" for proc in PROC_NAMES)
+_CAPTIONS = tuple(
+    f"Bundled payment {_usd(b)} • SNF {int(u*100)} % × {SNF_LOS_DAYS:.1f} d"
+    for b, u in zip(BASELINES, SNF_UTIL)
+)
+
+
+# every model input, passed to _compute so edits change its cache key
+_MODEL = (tuple(BASELINES.tolist()), tuple(SAVINGS_FACTORS.tolist()),
+          _DISCOUNT_FACTOR, _QUALITY_FACTOR, CH_COST_EPISODE)
+
+
+# the model is pure in its arguments, so repeat inputs are a cache lookup;
+# bounded because the key space is every combination of four volumes
+@st.cache_data(show_spinner=False, max_entries=1_000)
+def _compute(volumes, model):
+    baselines, savings_factors, discount_factor, quality_factor, ch_cost = model
+    (total_rec, impl_cost, net_impact, roi_pct,
+     target, expected, recon_ep, annual, qual) = compute_roi(
+        np.array(baselines, dtype=np.float64),
+        np.array(volumes, dtype=np.float64),
+        np.array(savings_factors, dtype=np.float64),
+        discount_factor, quality_factor, ch_cost)
+    return {
+        "total_rec":       total_rec,
+        "net_impact":      net_impact,
+        "roi_pct":         roi_pct,
+        "impl_cost_total": impl_cost,
+        "columns": {
+            "Target price":           target,
+            "Expected cost":          expected,
+            "Recon per episode":      recon_ep,
+            "Annual reconciliation":  annual,
+            "Quality-adjusted recon": qual,
+        },
+    }
+
 
 # ---------- page ----------
 st.set_page_config(page_title="CMS TEAM ROI Calculator – Current Health",
@@ -28,13 +124,7 @@ st.set_page_config(page_title="CMS TEAM ROI Calculator – Current Health",
 
 st.title("CMS TEAM ROI Calculator – Current Health Edition")
 
-st.markdown(
-    f"**Assumptions**  \n"
-    f"• SNF ${SNF_DAILY_COST:,}/day × {SNF_LOS_DAYS:.1f} days  \n"
-    f"• Home-health increment +${HHA_EXTRA_COST}  \n"
-    f"• Current Health cost ${CH_COST_EPISODE:,}/episode  \n"
-    f"• Quality boost +{CH_QUALITY_PPT:.1f} pp"
-)
+st.markdown(_ASSUMPTIONS_MD)
 
 track = st.sidebar.radio(
     "TEAM participation track",
@@ -42,60 +132,69 @@ track = st.sidebar.radio(
     index=0,
 )
 
-# ---------- volume inputs ----------
-st.header("Annual episode volumes")
-
-rows, total_vol = [], 0
-for proc, meta in PROCEDURE_META.items():
-    st.subheader(proc)
-    st.caption(f"Bundled payment ${meta['baseline']:,} • "
-               f"SNF {int(meta['snf_util']*100)} % × {SNF_LOS_DAYS:.1f} d")
-    vol = st.number_input("Volume", 0, 500, 0, 1, key=f"vol_{proc}")
-    total_vol += vol
-    rows.append({
-        "Procedure": proc,
-        "Volume": vol,
-        "Baseline cost": meta["baseline"],
-        "Cost-reduction %": meta["savings_pct"],
-    })
-
-if total_vol == 0:
-    st.warning("Enter at least one volume above zero to view results.")
-    st.stop()
-
-df = pd.DataFrame(rows)
-
-# ---------- calculations ----------
-df["Target price"]           = df["Baseline cost"] * (1 - CMS_DISCOUNT_PCT/100)
-df["Expected cost"]          = df["Baseline cost"] * (1 - df["Cost-reduction %"]/100)
-df["Recon per episode"]      = df["Target price"] - df["Expected cost"]
-df["Annual reconciliation"]  = df["Recon per episode"] * df["Volume"]
-df["Quality-adjusted recon"] = df["Annual reconciliation"] * (1 + CH_QUALITY_PPT/100)
-
-impl_cost_total = total_vol * CH_COST_EPISODE
-
-# ---------- results ----------
-st.header("Results")
-
-total_rec  = df["Quality-adjusted recon"].sum()
-net_impact = total_rec - impl_cost_total
-roi_pct    = (net_impact / impl_cost_total * 100) if impl_cost_total else 0.0
-
-st.metric("Reconciliation payment", f"${total_rec:,.0f}")
-st.metric("Program cost",          f"${impl_cost_total:,.0f}")
-st.metric("Net impact",            f"${net_impact:,.0f}")
-st.metric("ROI",                   f"{roi_pct:,.1f}%")
-
-with st.expander("Calculation table"):
-    st.dataframe(
-        df.style.format({
-            "Baseline cost":          "${:,.0f}",
-            "Target price":           "${:,.0f}",
-            "Expected cost":          "${:,.0f}",
-            "Recon per episode":      "${:,.0f}",
-            "Annual reconciliation":  "${:,.0f}",
-            "Quality-adjusted recon": "${:,.0f}",
-            "Cost-reduction %":       "{:,.1f}%",
-        }),
-        use_container_width=True,
-    )
+# ---------- volume inputs + results ----------
+# Submitting the form reruns only this fragment, not the page around it.
+@st.fragment
+def _roi_panel():
+    st.header("Annual episode volumes")
+
+    with st.form("volumes"):
+        cols = st.columns(len(PROC_NAMES))
+        for i, col in enumerate(cols):
+            with col:
+                st.markdown(_HEADERS[i])
+                st.caption(_CAPTIONS[i])
+                st.number_input("Volume", 0, 500, 0, 1, key=_VOL_KEYS[i])
+        submitted = st.form_submit_button("Compute ROI")
+
+    vols = np.fromiter((st.session_state[k] for k in _VOL_KEYS),
+                       dtype=np.int64, count=len(PROC_NAMES))
+    total_vol = int(vols.sum())
+
+    # only compute once the volumes have been submitted in this session
+    if submitted:
+        st.session_state["volumes_submitted"] = True
+    if not st.session_state.get("volumes_submitted"):
+        st.info("Enter annual volumes and press **Compute ROI** to view results.")
+        return
+
+    if total_vol == 0:
+        st.warning("Enter at least one volume above zero to view results.")
+        return
+
+    # ---------- calculations ----------
+    result = _compute(tuple(vols.tolist()), _MODEL)
+    total_rec       = result["total_rec"]
+    net_impact      = result["net_impact"]
+    roi_pct         = result["roi_pct"]
+    impl_cost_total = result["impl_cost_total"]
+
+    # ---------- results ----------
+    st.header("Results")
+
+    rec_col, cost_col, net_col, roi_col = st.columns(4)
+    rec_col.metric("Reconciliation payment", _usd(total_rec))
+    cost_col.metric("Program cost",          _usd(impl_cost_total))
+    net_col.metric("Net impact",             _usd(net_impact))
+    roi_col.metric("ROI",                    f"{roi_pct:,.1f}%")
+
+    with st.expander("Calculation table"):
+        table = {
+            "Procedure":        PROC_NAMES,
+            "Volume":           vols.tolist(),
+            "Baseline cost":    BASELINES,
+            "Cost-reduction %": SAVINGS_PCT,
+            **result["columns"],
+        }
+        for col, fmt in _TABLE_FORMATS.items():
+            table[col] = list(map(fmt, table[col]))
+        # one markdown table; "$" is escaped so amounts don't render as LaTeX
+        st.markdown("\n".join([
+            "| " + " | ".join(table) + " |",
+            "|:---|" + "---:|" * (len(table) - 1),
+            *("| " + " | ".join(str(v).replace("$", "\\$") for v in row) + " |"
+              for row in zip(*table.values())),
+        ]))
+
+
+_roi_panel()